@@ -1,6 +1,11 @@
 from pydantic_ai.providers.openrouter import OpenRouterProvider
 from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIModel
+from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
+from typing import List, Literal
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -11,8 +16,165 @@ load_dotenv()
 ROUTE = os.getenv("ROUTE")
 API_KEY = os.getenv("API_KEY")
 BASE_URL = os.getenv("BASE_URL")
+# Fast model for the first-pass fit scoring (defaults to ROUTE)
+SCORE_ROUTE = os.getenv("SCORE_ROUTE") or ROUTE
+# Secondary model raced against ROUTE when its first token is late (hedging is disabled if unset)
+HEDGE_ROUTE = os.getenv("HEDGE_ROUTE")
+
+
+def make_provider():
+    """
+    Creates the OpenRouter provider, sending requests to BASE_URL if it is set (e.g. a proxy or a local
+    OpenAI-compatible server) and to the default OpenRouter endpoint otherwise.
+    Returns:
+        OpenRouterProvider: The provider for the AI models.
+    """
+    if BASE_URL:
+        return OpenRouterProvider(openai_client=AsyncOpenAI(base_url=BASE_URL, api_key=API_KEY))
+    return OpenRouterProvider(api_key=API_KEY)
+
 
 # Initialize the OpenAI model with the OpenRouter provider
-model = OpenAIModel(ROUTE, provider=OpenRouterProvider(api_key=API_KEY))
+model = OpenAIModel(ROUTE, provider=make_provider())
 # Create an agent instance using the model
 agent = Agent(model)
+
+
+class FitScore(BaseModel):
+    """Structured result of the first-pass fit scoring of a CFP against the KB."""
+    score: int = Field(ge=0, le=4, description="Fit score of the CFP with the KB, from 0 to 4.")
+    matched_categories: List[Literal["directions", "use cases", "objectives", "constraints"]] = Field(
+        default_factory=list,
+        description="Categories in which the CFP and the KB match.",
+    )
+
+
+# Create a scoring agent that returns a FitScore instead of free text
+score_model = OpenAIModel(SCORE_ROUTE, provider=make_provider())
+score_agent = Agent(score_model, output_type=FitScore)
+
+# Create hedge agents on the secondary model, if configured
+hedge_agent = None
+hedge_score_agent = None
+if HEDGE_ROUTE:
+    hedge_model = OpenAIModel(HEDGE_ROUTE, provider=make_provider())
+    hedge_agent = Agent(hedge_model)
+    hedge_score_agent = Agent(hedge_model, output_type=FitScore)
+
+
+async def stream_agent_text(agent, prompt, first_token, stats, label):
+    """
+    Streams a text completion from an agent and returns the full text.
+    Sets first_token and records the time to first token in stats when the first chunk arrives,
+    or when the stream ends without any chunk.
+    Args:
+        agent (Agent): The agent to run.
+        prompt (str): The prompt to send.
+        first_token (asyncio.Event): Event set on the first streamed chunk.
+        stats (dict): Call statistics; 'ttft_<label>' is set in seconds.
+        label (str): 'primary' or 'hedge'.
+    Returns:
+        str: The complete response text.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    chunks = []
+    async with agent.run_stream(prompt) as result:
+        async for delta in result.stream_text(delta=True):
+            if not first_token.is_set():
+                stats[f'ttft_{label}'] = round(loop.time() - start, 3)
+                first_token.set()
+            chunks.append(delta)
+    if not first_token.is_set():
+        stats[f'ttft_{label}'] = round(loop.time() - start, 3)
+        first_token.set()
+    return ''.join(chunks)
+
+
+async def run_agent_output(agent, prompt, first_token, stats, label):
+    """
+    Runs an agent with structured output, which arrives as a whole rather than streamed.
+    Sets first_token and records the time to the complete output in stats as 'ttft_<label>'.
+    Args:
+        agent (Agent): The agent to run.
+        prompt (str): The prompt to send.
+        first_token (asyncio.Event): Event set when the output arrives.
+        stats (dict): Call statistics; 'ttft_<label>' is set in seconds.
+        label (str): 'primary' or 'hedge'.
+    Returns:
+        The agent's structured output.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    result = await agent.run(prompt)
+    stats[f'ttft_{label}'] = round(loop.time() - start, 3)
+    first_token.set()
+    return result.output
+
+
+async def run_hedged(primary_agent, prompt, deadline, hedge_delay, secondary_agent=None, stats=None,
+                     call=stream_agent_text):
+    """
+    Runs a streamed completion on the primary agent with a per-call deadline.
+    If the primary has not produced its first token within hedge_delay seconds, or fails before the
+    secondary was started, the same prompt is also sent to the secondary agent, and the first complete answer wins.
+    Args:
+        primary_agent (Agent): The agent on the primary model.
+        prompt (str): The prompt to send.
+        deadline (float): Maximum seconds for the whole call.
+        hedge_delay (float): Seconds to wait for the primary's first token before hedging.
+        secondary_agent (Agent, optional): The agent on the secondary model.
+        stats (dict, optional): Dict to record call statistics in, so they are kept when the call times out.
+        call (coroutine function, optional): How each agent is run: stream_agent_text for text, or
+            run_agent_output for structured output, where the first token is the complete output.
+    Returns:
+        tuple: (response text or structured output, stats dict with 'winner', 'hedged', and 'ttft_primary'/'ttft_hedge').
+        If the primary never produced a first token, 'ttft_primary_censored' holds the seconds it was
+        waited for instead, a lower bound on its TTFT.
+    Raises:
+        TimeoutError: If no answer completes within the deadline.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({'winner': None, 'hedged': False})
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    primary_first = asyncio.Event()
+    tasks = {asyncio.create_task(call(primary_agent, prompt, primary_first, stats, 'primary')): 'primary'}
+    try:
+        async with asyncio.timeout(deadline):
+            # Wait for the first token (or an early failure) of the primary
+            first_waiter = asyncio.create_task(primary_first.wait())
+            await asyncio.wait([first_waiter, *tasks], timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+            first_waiter.cancel()
+            if not primary_first.is_set() and not any(task.done() for task in tasks) and secondary_agent is not None:
+                logging.info(f"No first token from primary model after {hedge_delay}s, hedging with secondary model.")
+                stats['hedged'] = True
+                hedge_first = asyncio.Event()
+                tasks[asyncio.create_task(call(secondary_agent, prompt, hedge_first, stats, 'hedge'))] = 'hedge'
+
+            # The first answer that completes without error wins
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        stats['winner'] = tasks[task]
+                        return task.result(), stats
+                    error = task.exception()
+                    logging.error(f"The {tasks[task]} model failed: {error}")
+                    if not stats['hedged'] and secondary_agent is not None:
+                        # Fail over to the secondary model
+                        logging.info("Primary model failed, retrying with secondary model.")
+                        stats['hedged'] = True
+                        hedge_first = asyncio.Event()
+                        hedge = asyncio.create_task(call(secondary_agent, prompt, hedge_first, stats, 'hedge'))
+                        tasks[hedge] = 'hedge'
+                        pending.add(hedge)
+            raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        if 'ttft_primary' not in stats:
+            stats['ttft_primary_censored'] = round(loop.time() - start, 3)
@@ -0,0 +1,185 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from dedup import strip_prefix
+from dotenv import load_dotenv
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cfps (
+    id INTEGER PRIMARY KEY,
+    profile TEXT NOT NULL DEFAULT '',
+    venue TEXT,
+    link TEXT NOT NULL,
+    title TEXT,
+    text TEXT,
+    response TEXT,
+    fit_score INTEGER,
+    matched_categories TEXT,
+    archived_at TEXT NOT NULL,
+    UNIQUE (profile, link)
+);
+CREATE INDEX IF NOT EXISTS cfps_fit_score ON cfps (fit_score);
+CREATE INDEX IF NOT EXISTS cfps_archived_at ON cfps (archived_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS cfps_fts USING fts5(
+    title, venue, text, response, content='cfps', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS cfps_ai AFTER INSERT ON cfps BEGIN
+    INSERT INTO cfps_fts (rowid, title, venue, text, response)
+    VALUES (new.id, new.title, new.venue, new.text, new.response);
+END;
+CREATE TRIGGER IF NOT EXISTS cfps_ad AFTER DELETE ON cfps BEGIN
+    INSERT INTO cfps_fts (cfps_fts, rowid, title, venue, text, response)
+    VALUES ('delete', old.id, old.title, old.venue, old.text, old.response);
+END;
+CREATE TRIGGER IF NOT EXISTS cfps_au AFTER UPDATE ON cfps BEGIN
+    INSERT INTO cfps_fts (cfps_fts, rowid, title, venue, text, response)
+    VALUES ('delete', old.id, old.title, old.venue, old.text, old.response);
+    INSERT INTO cfps_fts (rowid, title, venue, text, response)
+    VALUES (new.id, new.title, new.venue, new.text, new.response);
+END;
+"""
+
+
+def connect_archive(path):
+    """
+    Opens the CFP archive, creating the database and its FTS5 index if needed.
+    Args:
+        path (str): The SQLite database path.
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def archive_cfps(cfps, path):
+    """
+    Archives analyzed CFP records in a single transaction. A CFP archived again for the same profile
+    (e.g. by a resumed run) replaces its earlier row.
+    Args:
+        cfps (list): CFP records with analysis fields and an optional 'profile'.
+        path (str): The SQLite database path.
+    """
+    archived_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    rows = [
+        (
+            entry.get('profile') or '',
+            strip_prefix(entry['venue'], 'Venue:'),
+            strip_prefix(entry['link'], 'Link:'),
+            strip_prefix(entry['title'], 'Title:'),
+            entry['text'],
+            entry.get('response', ''),
+            entry.get('fit_score'),
+            json.dumps(entry.get('matched_categories', [])),
+            archived_at,
+        )
+        for entry in cfps
+    ]
+    if not rows:
+        return
+    conn = None
+    try:
+        conn = connect_archive(path)
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO cfps (profile, venue, link, title, text, response, fit_score, matched_categories, archived_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (profile, link) DO UPDATE SET
+                    venue = excluded.venue, title = excluded.title, text = excluded.text,
+                    response = excluded.response, fit_score = excluded.fit_score,
+                    matched_categories = excluded.matched_categories, archived_at = excluded.archived_at
+                """,
+                rows,
+            )
+        logging.info(f"Archived {len(rows)} CFPs to {path}")
+    except Exception as e:
+        logging.error(f"Error archiving CFPs: {e}")
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def search_archive(path, query=None, min_score=None, since=None, until=None, profile=None, limit=20):
+    """
+    Searches the archive by full-text query over title, venue, text and response, and by fit score and date.
+    Args:
+        path (str): The SQLite database path.
+        query (str, optional): An FTS5 query, e.g. '"federated learning"'.
+        min_score (int, optional): Minimum fit score.
+        since (str, optional): Earliest archive date (YYYY-MM-DD).
+        until (str, optional): Latest archive date (YYYY-MM-DD).
+        profile (str, optional): Only return CFPs analyzed for this profile.
+        limit (int): Maximum number of results.
+    Returns:
+        list: Tuples of (archived_at, fit_score, profile, venue, title, link), best matches first.
+    """
+    conditions, params = [], []
+    if query:
+        conditions.append("cfps_fts MATCH ?")
+        params.append(query)
+    if min_score is not None:
+        conditions.append("cfps.fit_score >= ?")
+        params.append(min_score)
+    if since:
+        conditions.append("cfps.archived_at >= ?")
+        params.append(since)
+    if until:
+        conditions.append("cfps.archived_at < date(?, '+1 day')")
+        params.append(until)
+    if profile:
+        conditions.append("cfps.profile = ?")
+        params.append(profile)
+    sql = "SELECT cfps.archived_at, cfps.fit_score, cfps.profile, cfps.venue, cfps.title, cfps.link FROM cfps"
+    if query:
+        sql += " JOIN cfps_fts ON cfps_fts.rowid = cfps.id"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY bm25(cfps_fts)" if query else " ORDER BY cfps.archived_at DESC"
+    sql += " LIMIT ?"
+    params.append(limit)
+    conn = connect_archive(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    # Load environment variables from .env file
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Search the archive of analyzed CFPs.")
+    parser.add_argument("query", nargs="?", help='FTS5 query, e.g. \'"federated learning"\'')
+    parser.add_argument("--min-score", type=int, help="minimum fit score (0-4)")
+    parser.add_argument("--since", help="earliest archive date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="latest archive date (YYYY-MM-DD)")
+    parser.add_argument("--profile", help="only CFPs analyzed for this profile")
+    parser.add_argument("--limit", type=int, default=20, help="maximum number of results")
+    parser.add_argument("--db", default=os.getenv("ARCHIVE_PATH", os.path.join("cache", "archive.db")),
+                        help="archive database path")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        results = search_archive(args.db, args.query, args.min_score, args.since, args.until, args.profile, args.limit)
+    except sqlite3.OperationalError as e:
+        print(f"Invalid search query: {e}", file=sys.stderr)
+        print('Quote phrases and words with punctuation, e.g. \'"federated learning"\' or \'"edge-computing"\'; '
+              'combine terms with AND, OR and NOT.', file=sys.stderr)
+        sys.exit(2)
+    elapsed = (time.perf_counter() - start) * 1000
+    for archived_at, fit_score, profile, venue, title, link in results:
+        score = f"{fit_score}/4" if fit_score is not None else "-/4"
+        print(f"{archived_at[:10]}  {score}  {venue}  {title}")
+        print(f"    {link}" + (f"  ({profile})" if profile else ""))
+    print(f"{len(results)} results in {elapsed:.1f} ms")
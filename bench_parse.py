@@ -0,0 +1,68 @@
+import argparse
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils import show_diff_and_extract_links, extract_cfp_markdown
+from urls import URLS
+
+ELEMENT = URLS[0]['element']
+BASE = URLS[0]['base']
+
+
+def parse_page(html):
+    """
+    Runs the CPU-bound work of one run on a page: link extraction over a full diff and Markdown conversion.
+    Args:
+        html (str): The raw HTML of the page.
+    Returns:
+        int: The number of links found, to keep the returned record small.
+    """
+    links = show_diff_and_extract_links('', html, BASE, ELEMENT)
+    extract_cfp_markdown(html)
+    return len(links)
+
+
+def run(pages, workers):
+    """
+    Parses all pages with the given number of worker processes.
+    Args:
+        pages (list): Raw HTML pages.
+        workers (int): The number of worker processes.
+    Returns:
+        float: Pages parsed per second.
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(parse_page, pages, chunksize=max(1, len(pages) // (workers * 4))))
+    return len(pages) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML parsing throughput over the downloads/ corpus.")
+    parser.add_argument("--repeat", type=int, default=20, help="times to repeat the corpus")
+    parser.add_argument("--workers", type=int, nargs="+", help="worker counts to compare (default: 1, 2, 4, ... up to the CPU count)")
+    args = parser.parse_args()
+
+    # Keep per-page log lines out of the run log
+    logging.getLogger().setLevel(logging.WARNING)
+
+    corpus = []
+    for path in sorted(glob.glob(os.path.join("downloads", "*", "*.html"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            corpus.append(f.read())
+    pages = corpus * args.repeat
+
+    workers = args.workers
+    if not workers:
+        workers = [1]
+        while workers[-1] * 2 <= (os.cpu_count() or 1):
+            workers.append(workers[-1] * 2)
+
+    print(f"{len(pages)} pages ({len(corpus)} unique), {os.cpu_count()} CPUs")
+    baseline = None
+    for count in workers:
+        throughput = run(pages, count)
+        baseline = baseline or throughput
+        print(f"{count:>3} workers: {throughput:8.1f} pages/s  ({throughput / baseline:.2f}x)")
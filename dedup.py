@@ -0,0 +1,285 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+# MinHash/LSH parameters: 32 bands of 4 rows flag pairs from about 0.4 Jaccard similarity as candidates
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# CFPs with fewer shingles than this (e.g. pages without <div class="text-long">) are only matched by URL
+MIN_SHINGLES = 10
+_PRIME = (1 << 61) - 1
+
+
+def _make_permutations(num_perm):
+    """
+    Derives deterministic (a, b) coefficients for the universal hash functions used by MinHash.
+    Args:
+        num_perm (int): The number of hash functions.
+    Returns:
+        list of tuples: (a, b) coefficients, one pair per hash function.
+    """
+    perms = []
+    for i in range(num_perm):
+        digest = hashlib.blake2b(f"perm-{i}".encode('utf-8'), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'little') % _PRIME or 1
+        b = int.from_bytes(digest[8:], 'little') % _PRIME
+        perms.append((a, b))
+    return perms
+
+
+_PERMUTATIONS = _make_permutations(NUM_PERM)
+
+
+def normalize_url(url):
+    """
+    Normalizes a CFP link so that the same page listed under slightly different URLs compares equal.
+    Drops the scheme, "www.", query string, fragment, trailing slash, and ".html" suffix, and lowercases the result.
+    Args:
+        url (str): The URL (optionally prefixed with "Link: " as in CFP files).
+    Returns:
+        str: The normalized URL.
+    """
+    url = url.strip()
+    if url.startswith('Link:'):
+        url = url[len('Link:'):].strip()
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parsed.path.rstrip('/')
+    if path.endswith('.html'):
+        path = path[:-5]
+    return f"{host}{path}".lower()
+
+
+def shingle_text(text, k=SHINGLE_SIZE):
+    """
+    Splits text into a set of hashed word k-shingles.
+    Args:
+        text (str): The text to shingle.
+        k (int): The number of words per shingle.
+    Returns:
+        set: 64-bit integer hashes of the shingles.
+    """
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    shingles = set()
+    for i in range(len(words) - k + 1):
+        shingle = ' '.join(words[i:i + k])
+        shingles.add(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little'))
+    return shingles
+
+
+def minhash_signature(shingles):
+    """
+    Computes the MinHash signature of a set of hashed shingles.
+    Args:
+        shingles (set): 64-bit integer hashes of the shingles.
+    Returns:
+        tuple: NUM_PERM minimum hash values.
+    """
+    return tuple(
+        min((a * x + b) % _PRIME for x in shingles)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimate_similarity(sig_a, sig_b):
+    """
+    Estimates the Jaccard similarity of two sets from their MinHash signatures.
+    Args:
+        sig_a (tuple): The first signature.
+        sig_b (tuple): The second signature.
+    Returns:
+        float: The fraction of equal signature positions.
+    """
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def find_candidate_pairs(signatures):
+    """
+    Finds candidate near-duplicate pairs with LSH banding, so that only documents sharing a band are compared.
+    Args:
+        signatures (dict): Maps a document index to its MinHash signature.
+    Returns:
+        set of tuples: (i, j) index pairs with i < j.
+    """
+    candidates = set()
+    for band in range(BANDS):
+        buckets = {}
+        start = band * ROWS
+        for index, sig in signatures.items():
+            buckets.setdefault(sig[start:start + ROWS], []).append(index)
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    candidates.add((members[i], members[j]))
+    return candidates
+
+
+def strip_prefix(value, prefix):
+    """Removes a field prefix such as "Venue:" from a CFP record value."""
+    value = value.strip()
+    if value.startswith(prefix):
+        return value[len(prefix):].strip()
+    return value
+
+
+def cluster_cfps(cfps, threshold=0.8):
+    """
+    Groups near-duplicate CFP records and returns one record per cluster.
+    Records are clustered when their normalized links are equal, or when their MinHash similarity over
+    title and text is at least threshold. The first record of a cluster is kept; its venue lists every venue
+    of the cluster, 'duplicates' holds the links of the other records, and 'signature' its MinHash signature
+    (None for CFPs too short to sign).
+    Args:
+        cfps (list): CFP records as returned by load_diff_files.
+        threshold (float): Minimum estimated Jaccard similarity for two CFPs to be duplicates.
+    Returns:
+        list: The deduplicated CFP records.
+    """
+    records = list(cfps)
+    parent = list(range(len(records)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    # Exact matches on normalized URLs
+    by_url = {}
+    for index, entry in enumerate(records):
+        url = normalize_url(entry['link'])
+        if url in by_url:
+            union(by_url[url], index)
+        else:
+            by_url[url] = index
+
+    # Near-duplicate text via MinHash + LSH
+    signatures = {}
+    for index, entry in enumerate(records):
+        shingles = shingle_text(f"{strip_prefix(entry['title'], 'Title:')}\n{entry['text']}")
+        if len(shingles) >= MIN_SHINGLES:
+            signatures[index] = minhash_signature(shingles)
+    for i, j in find_candidate_pairs(signatures):
+        if estimate_similarity(signatures[i], signatures[j]) >= threshold:
+            union(i, j)
+
+    clusters = {}
+    for index in range(len(records)):
+        clusters.setdefault(find(index), []).append(index)
+
+    results = []
+    for members in clusters.values():
+        entry = records[members[0]]
+        if len(members) > 1:
+            venues = []
+            for index in members:
+                for venue in strip_prefix(records[index]['venue'], 'Venue:').split(', '):
+                    if venue and venue not in venues:
+                        venues.append(venue)
+            entry['venue'] = f"Venue: {', '.join(venues)}"
+            entry['duplicates'] = [records[index]['link'] for index in members[1:]]
+            logging.info(f"Merged {len(members)} duplicate CFPs: {entry['title']} ({', '.join(venues)})")
+        entry['signature'] = signatures.get(members[0])
+        results.append(entry)
+    logging.info(f"Deduplicated {len(records)} CFPs into {len(results) - (len(cfps) - len(records))} unique CFPs")
+    return results
+
+
+def load_seen(path, max_age_days):
+    """
+    Loads the store of CFPs emailed by earlier runs, dropping CFPs seen more than max_age_days ago
+    so that next year's edition of a recurring CFP is not mistaken for this year's.
+    Args:
+        path (str): The seen store file path.
+        max_age_days (int): How long a CFP is remembered.
+    Returns:
+        dict: The seen store, with a 'cfps' dict mapping a normalized link to its 'seen_at' date and 'signature'.
+    """
+    if not os.path.exists(path):
+        return {'cfps': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        seen = json.load(f)
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).strftime('%Y-%m-%d')
+    seen['cfps'] = {key: item for key, item in seen['cfps'].items() if item['seen_at'] >= cutoff}
+    return seen
+
+
+def save_seen(seen, path):
+    """
+    Durably writes the seen store through a temporary file, like the run journal.
+    Args:
+        seen (dict): The seen store.
+        path (str): The seen store file path.
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(seen, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def remember_cfps(seen, signatures):
+    """
+    Records CFPs in the seen store as seen today.
+    Args:
+        seen (dict): The seen store.
+        signatures (dict): Maps a normalized link to the CFP's MinHash signature, or None.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    for key, signature in signatures.items():
+        seen['cfps'][key] = {'seen_at': today, 'signature': list(signature) if signature else None}
+
+
+def find_seen_cfps(cfps, seen, threshold=0.8):
+    """
+    Finds CFP records that an earlier run already handled, by normalized link or by MinHash similarity
+    to a remembered signature. Remembered signatures are looked up by LSH band, as in find_candidate_pairs.
+    Args:
+        cfps (list): CFP records as returned by cluster_cfps.
+        seen (dict): The seen store.
+        threshold (float): Minimum estimated Jaccard similarity for a CFP to match a seen CFP.
+    Returns:
+        list of tuples: (record, normalized link of the matching seen CFP).
+    """
+    buckets = {}
+    for key, item in seen['cfps'].items():
+        if item.get('signature'):
+            for band in range(BANDS):
+                start = band * ROWS
+                buckets.setdefault((band, tuple(item['signature'][start:start + ROWS])), []).append(key)
+
+    matches = []
+    for entry in cfps:
+        links = [normalize_url(link) for link in [entry['link'], *entry.get('duplicates', [])]]
+        match = next((key for key in links if key in seen['cfps']), None)
+        signature = entry.get('signature')
+        if match is None and signature:
+            candidates = set()
+            for band in range(BANDS):
+                start = band * ROWS
+                candidates.update(buckets.get((band, tuple(signature[start:start + ROWS])), []))
+            match = next(
+                (key for key in sorted(candidates)
+                 if estimate_similarity(signature, seen['cfps'][key]['signature']) >= threshold),
+                None,
+            )
+        if match is not None:
+            matches.append((entry, match))
+    return matches
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+
+# Stages a CFP goes through, in order
+STAGES = ['found', 'fetched', 'extracted', 'analyzed', 'emailed']
+# Stages tracked separately for every profile, since each profile analyzes and emails the shared CFPs
+PROFILE_STAGES = ['analyzed', 'emailed']
+# Fields of an analyzed CFP record that are kept in the journal so analysis is not repeated on resume.
+# The prompt (KB plus CFP text) is left out: it is large, repeated per profile, and can be regenerated.
+RESULT_FIELDS = ['fit_score', 'matched_categories', 'response', 'llm_stats']
+
+
+def _apply_event(journal, event):
+    """
+    Applies one journal event to the in-memory journal.
+    Args:
+        journal (dict): The journal.
+        event (dict): {'key', 'deleted': True} removes a CFP; {'key', 'fields'} adds fields to a CFP,
+            and with 'stage' (and 'profile' for PROFILE_STAGES) also records a completed stage.
+    """
+    key = event['key']
+    if event.get('deleted'):
+        journal['cfps'].pop(key, None)
+        return
+    item = journal['cfps'].setdefault(key, {})
+    stage = event.get('stage')
+    if stage in PROFILE_STAGES:
+        item = item.setdefault('profiles', {}).setdefault(event['profile'], {})
+    item.update(event.get('fields', {}))
+    # A CFP never moves back to an earlier stage
+    if stage and ('stage' not in item or STAGES.index(stage) > STAGES.index(item['stage'])):
+        item['stage'] = stage
+
+
+def _append_event(journal, event, path):
+    """
+    Applies an event and durably appends it to the journal file as one JSON line, so that each change
+    costs one small write instead of a rewrite of the whole journal.
+    Args:
+        journal (dict): The journal.
+        event (dict): The event, see _apply_event.
+        path (str): The journal file path.
+    """
+    _apply_event(journal, event)
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_journal(path):
+    """
+    Loads the run journal by replaying its events, or returns an empty one if no previous run left a journal behind.
+    The journal is then compacted to one line per CFP. A line cut short by a crash is skipped.
+    A journal left in the older single-JSON format next to path (journal.json for journal.jsonl) is migrated.
+    Args:
+        path (str): The journal file path.
+    Returns:
+        dict: The journal, with a 'cfps' dict keyed by normalized CFP link.
+    """
+    journal = {'cfps': {}}
+    legacy_path = os.path.splitext(path)[0] + '.json'
+    if not os.path.exists(path) and legacy_path != path and os.path.exists(legacy_path):
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+        save_journal(journal, path)
+        os.remove(legacy_path)
+        logging.info(f"Migrated the run journal from {legacy_path} to {path}")
+    if not os.path.exists(path):
+        return journal
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                logging.error(f"Skipping a corrupt line of the run journal: {line[:80]!r}")
+                continue
+            _apply_event(journal, event)
+    save_journal(journal, path)
+    if journal['cfps']:
+        logging.info(f"Resuming {len(journal['cfps'])} unfinished CFPs from the run journal")
+    return journal
+
+
+def save_journal(journal, path):
+    """
+    Durably compacts the journal to one line per CFP: the new content is written to a temporary file,
+    flushed to disk, and atomically moved over the old journal, so a crash never leaves a partial journal.
+    Args:
+        journal (dict): The journal.
+        path (str): The journal file path.
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for key, item in journal['cfps'].items():
+            f.write(json.dumps({'key': key, 'fields': item}, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def update_cfp(journal, key, path, **fields):
+    """
+    Records fields of a CFP, adding the CFP to the journal if needed.
+    Args:
+        journal (dict): The journal.
+        key (str): The normalized CFP link.
+        path (str): The journal file path.
+        **fields: The fields to store for the CFP.
+    """
+    _append_event(journal, {'key': key, 'fields': fields}, path)
+
+
+def delete_cfp(journal, key, path):
+    """
+    Removes a CFP from the journal.
+    Args:
+        journal (dict): The journal.
+        key (str): The normalized CFP link.
+        path (str): The journal file path.
+    """
+    if key in journal['cfps']:
+        _append_event(journal, {'key': key, 'deleted': True}, path)
+
+
+def reached_stage(journal, key, stage, profile=None):
+    """
+    Checks whether a CFP has completed the given stage.
+    Args:
+        journal (dict): The journal.
+        key (str): The normalized CFP link.
+        stage (str): One of STAGES.
+        profile (str, optional): The profile name, required for PROFILE_STAGES.
+    Returns:
+        bool: True if the CFP is journaled at this stage or a later one.
+    """
+    item = journal['cfps'].get(key)
+    if item is not None and stage in PROFILE_STAGES:
+        item = item.get('profiles', {}).get(profile)
+    return item is not None and STAGES.index(item['stage']) >= STAGES.index(stage)
+
+
+def set_stage(journal, key, stage, path, profile=None, **fields):
+    """
+    Records that a CFP completed a stage, together with any fields needed to resume from it.
+    Only the new fields are appended to the journal file.
+    Args:
+        journal (dict): The journal.
+        key (str): The normalized CFP link.
+        stage (str): One of STAGES.
+        path (str): The journal file path.
+        profile (str, optional): The profile name, required for PROFILE_STAGES.
+        **fields: Extra fields to store for the CFP.
+    """
+    event = {'key': key, 'stage': stage, 'fields': fields}
+    if stage in PROFILE_STAGES:
+        event['profile'] = profile
+    _append_event(journal, event, path)
+
+
+def finished_cfps(journal, profiles):
+    """
+    Returns the CFPs that were emailed to every profile.
+    Args:
+        journal (dict): The journal.
+        profiles (list): The names of the profiles of this run.
+    Returns:
+        dict: The finished journal items, keyed by normalized CFP link.
+    """
+    return {
+        key: item for key, item in journal['cfps'].items()
+        if all(reached_stage(journal, key, 'emailed', profile) for profile in profiles)
+    }
+
+
+def prune_journal(journal, path, profiles):
+    """
+    Removes CFPs that were emailed to every profile, and compacts the journal.
+    Args:
+        journal (dict): The journal.
+        path (str): The journal file path.
+        profiles (list): The names of the profiles of this run.
+    """
+    finished = finished_cfps(journal, profiles)
+    journal['cfps'] = {key: item for key, item in journal['cfps'].items() if key not in finished}
+    save_journal(journal, path)
+    logging.info(f"Run journal pruned, {len(journal['cfps'])} unfinished CFPs left")
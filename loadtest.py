@@ -0,0 +1,506 @@
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Vocabulary for generated CFP and KB text
+TOPICS = [
+    'federated learning', 'network slicing', 'edge computing', 'reconfigurable intelligent surfaces',
+    'integrated sensing and communication', 'semantic communication', 'non-terrestrial networks',
+    'digital twins', 'open RAN', 'quantum networking', 'vehicular networks', 'intent-based networking',
+    'large language models for networks', 'energy-efficient 6G', 'physical layer security', 'UAV networks',
+]
+WORDS = (
+    'we invite original contributions on the design analysis optimization and deployment of future wireless '
+    'and wired networks including theory algorithms protocols testbeds datasets and field trials that address '
+    'latency reliability scalability energy efficiency privacy security mobility and resource management in '
+    'emerging applications such as industrial automation smart cities healthcare and immersive media'
+).split()
+# Stage functions of main.py whose wall time is reported, by stage
+STAGE_FUNCTIONS = {
+    'process_urls': 'fetch', 'fetch_journaled_cfps': 'fetch', 'load_kbs': 'kb',
+    'load_diff_files': 'extract', 'cluster_cfps': 'extract', 'journal_extracted_cfps': 'extract',
+    'analyze_cfps': 'analyze', 'save_cfps_to_json': 'save', 'archive_cfps': 'save', 'email_cfps': 'email',
+    'cleanup_tmp_folder': 'cleanup',
+}
+
+
+def generate_text(rng, words):
+    """
+    Generates pseudo-random prose from the vocabulary.
+    Args:
+        rng (random.Random): The random generator.
+        words (int): The number of words.
+    Returns:
+        str: The generated text.
+    """
+    out = []
+    while len(out) < words:
+        out.extend(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+        out.append(rng.choice(TOPICS))
+    return ' '.join(out[:words])
+
+
+class FakeSite:
+    """
+    State of the fake comsoc.org: venue pages listing CFP links, and CFP pages with a div.text-long.
+    Each call to advance_day publishes new CFPs on a fraction (the churn rate) of the venues.
+    Every page is padded to about page_kb KB with static navigation and footer markup, like the real site.
+    """
+
+    def __init__(self, sources, new_cfps, churn, dup_rate, cfp_words, page_kb, seed):
+        self.sources = sources
+        self.new_cfps = new_cfps
+        self.churn = churn
+        self.dup_rate = dup_rate
+        self.cfp_words = cfp_words
+        self.rng = random.Random(seed)
+        self.boilerplate = make_boilerplate(page_kb * 1024)
+        self.listings = [[] for _ in range(sources)]
+        self.cfps = {}
+        self.day = 0
+        self.lock = threading.Lock()
+
+    def advance_day(self):
+        """
+        Publishes the new CFPs of the next day.
+        Returns:
+            int: The number of unique CFPs published (cross-listings are not counted).
+        """
+        with self.lock:
+            self.day += 1
+            changed = self.rng.sample(range(self.sources), max(1, round(self.sources * self.churn)))
+            for i in range(self.new_cfps):
+                cfp_id = f"{self.day}-{i}"
+                title = f"Special Issue on {self.rng.choice(TOPICS).title()} ({cfp_id})"
+                text = generate_text(random.Random(cfp_id), self.cfp_words)
+                self.cfps[cfp_id] = (title, text)
+                venue = changed[i % len(changed)]
+                self.listings[venue].append((f"/cfp/{cfp_id}", title))
+                if self.rng.random() < self.dup_rate:
+                    # Cross-list on another venue, either under a URL variant or as a near-identical copy
+                    other = self.rng.choice(changed)
+                    if self.rng.random() < 0.5:
+                        self.listings[other].append((f"/cfp/{cfp_id}/", title))
+                    else:
+                        copy_id = f"{cfp_id}-copy"
+                        self.cfps[copy_id] = (title + " - Extended Deadline", text)
+                        self.listings[other].append((f"/cfp/{copy_id}", title))
+            return self.new_cfps
+
+    def venue_page(self, index):
+        """Renders the page of a venue."""
+        with self.lock:
+            items = '\n'.join(f'<li><a href="{href}" hreflang="en">{title}</a></li>' for href, title in self.listings[index])
+        return (
+            f"<html><head><title>Venue {index}</title></head><body>\n{self.boilerplate}\n"
+            f'<div  class="main-content main-content--with-sidebar">\n<h1>Venue {index}</h1>\n<ul>\n{items}\n</ul>\n</div>\n'
+            "</body></html>\n"
+        )
+
+    def cfp_page(self, cfp_id):
+        """Renders a CFP page, or returns None for unknown CFPs."""
+        cfp = self.cfps.get(cfp_id)
+        if cfp is None:
+            return None
+        title, text = cfp
+        paragraphs = '\n'.join(f"<p>{text[i:i + 600]}</p>" for i in range(0, len(text), 600))
+        return (
+            f"<html><body>{self.boilerplate}\n<div class=\"header\">{title}</div>\n"
+            f"<div class=\"text-long\"><h2>{title}</h2>\n{paragraphs}\n</div></body></html>\n"
+        )
+
+
+def make_boilerplate(size):
+    """
+    Generates static site markup (menus and footer text) of about size bytes, outside the parsed content divs.
+    Args:
+        size (int): The target size in bytes.
+    Returns:
+        str: The markup, the same for every page and every day.
+    """
+    rng = random.Random('boilerplate')
+    parts, length = [], 0
+    while length < size:
+        topic = rng.choice(TOPICS)
+        part = (
+            f'<div class="menu-item"><a href="/topics/{topic.replace(" ", "-")}">{topic.title()}</a>'
+            f'<p class="teaser">{generate_text(rng, 40)}</p></div>'
+        )
+        parts.append(part)
+        length += len(part) + 1
+    return '<nav class="site-nav">\n' + '\n'.join(parts) + '\n</nav>'
+
+
+def make_site_handler(site):
+    """Creates the request handler of the fake comsoc.org server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = urlparse(self.path).path
+            match_venue = re.fullmatch(r'/venues/(\d+)/cfp', path)
+            match_cfp = re.fullmatch(r'/cfp/([\w-]+)/?', path)
+            body = None
+            if match_venue and int(match_venue.group(1)) < site.sources:
+                body = site.venue_page(int(match_venue.group(1)))
+            elif match_cfp:
+                body = site.cfp_page(match_cfp.group(1))
+            send_response(self, 200 if body else 404, body or 'not found', 'text/html; charset=utf-8')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_notion_handler(top_blocks, depth, branching):
+    """
+    Creates the request handler of the fake Notion blocks API. Every page has top_blocks children,
+    and every block has branching children down to the given depth.
+    """
+
+    def block(block_id, level):
+        block_type = ['heading_2', 'paragraph', 'bulleted_list_item'][level % 3]
+        rng = random.Random(block_id)
+        return {
+            'id': block_id,
+            'type': block_type,
+            'has_children': level < depth,
+            block_type: {'rich_text': [{'plain_text': f"{rng.choice(TOPICS)}: {generate_text(rng, 20)}"}]},
+        }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            match = re.fullmatch(r'/v1/blocks/([\w.-]+)/children', parsed.path)
+            if not match:
+                send_response(self, 404, '{}', 'application/json')
+                return
+            block_id = match.group(1)
+            level = block_id.count('.')
+            count = top_blocks if level == 0 else branching
+            params = parse_qs(parsed.query)
+            start = int(params.get('start_cursor', ['0'])[0])
+            size = int(params.get('page_size', ['100'])[0])
+            end = min(start + size, count)
+            data = {
+                'results': [block(f"{block_id}.{i}", level) for i in range(start, end)],
+                'has_more': end < count,
+                'next_cursor': str(end) if end < count else None,
+            }
+            send_response(self, 200, json.dumps(data), 'application/json')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_llm_handler(stats, latency, tokens_per_sec, output_words, slow_rate=0.0, slow_latency=0.0):
+    """
+    Creates the request handler of the fake OpenAI-compatible chat completions API.
+    Every call waits latency seconds before the first token, then produces tokens at tokens_per_sec.
+    A slow_rate fraction of the primary model's calls waits slow_latency seconds instead, to exercise hedging.
+    Tool calls (structured output) return a fit score derived from the prompt hash.
+    """
+    rng = random.Random(0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            prompt = ''.join(
+                m['content'] if isinstance(m.get('content'), str) else json.dumps(m.get('content'))
+                for m in request['messages']
+            )
+            digest = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16)
+            with stats['lock']:
+                stats['calls'] += 1
+            tool_call = None
+            if request.get('tools'):
+                arguments = {
+                    'score': digest % 5,
+                    'matched_categories': ['directions', 'use cases', 'objectives', 'constraints'][:digest % 5],
+                }
+                tool_call = {'name': request['tools'][0]['function']['name'], 'arguments': json.dumps(arguments)}
+                content = ''
+            elif 'Condense <KB>' in prompt:
+                content = 'Directions: ' + ', '.join(TOPICS[:6]) + '\nUse cases: smart cities\nObjectives: latency\nConstraints: privacy'
+            else:
+                content = '<br><br><b>Key Overlaps and Fits:</b><br><br>' + generate_text(random.Random(digest), output_words)
+
+            with stats['lock']:
+                slow = request['model'] == 'loadtest/primary' and rng.random() < slow_rate
+            time.sleep(slow_latency if slow else latency)
+            if request.get('stream'):
+                try:
+                    self.stream(request, content, tool_call)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled the call (e.g. the other model of a hedged call won)
+                    pass
+            else:
+                time.sleep(len(content.split()) / tokens_per_sec)
+                message = {'role': 'assistant', 'content': content or None}
+                if tool_call:
+                    message['tool_calls'] = [{'id': 'call_0', 'type': 'function', 'function': tool_call}]
+                data = completion(request, 'chat.completion', [{
+                    'index': 0, 'message': message, 'finish_reason': 'tool_calls' if tool_call else 'stop'
+                }])
+                data['usage'] = usage(prompt, content)
+                send_response(self, 200, json.dumps(data), 'application/json')
+
+        def stream(self, request, content, tool_call):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+
+            def send(data):
+                self.wfile.write(f"data: {json.dumps(data)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+            if tool_call:
+                send(completion(request, 'chat.completion.chunk', [{'index': 0, 'delta': {'role': 'assistant', 'tool_calls': [
+                    {'index': 0, 'id': 'call_0', 'type': 'function', 'function': tool_call}
+                ]}, 'finish_reason': None}]))
+            else:
+                words = content.split(' ')
+                for i in range(0, len(words), 10):
+                    piece = ' '.join(words[i:i + 10]) + (' ' if i + 10 < len(words) else '')
+                    send(completion(request, 'chat.completion.chunk', [
+                        {'index': 0, 'delta': {'role': 'assistant', 'content': piece}, 'finish_reason': None}
+                    ]))
+                    time.sleep(10 / tokens_per_sec)
+            send(completion(request, 'chat.completion.chunk', [
+                {'index': 0, 'delta': {}, 'finish_reason': 'tool_calls' if tool_call else 'stop'}
+            ]))
+            final = completion(request, 'chat.completion.chunk', [])
+            final['usage'] = usage(content, content)
+            send(final)
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def completion(request, obj, choices):
+    """Builds an OpenAI chat completion (or chunk) object."""
+    return {'id': 'chatcmpl-loadtest', 'object': obj, 'created': int(time.time()), 'model': request['model'], 'choices': choices}
+
+
+def usage(prompt, content):
+    """Builds an approximate token usage object."""
+    prompt_tokens, completion_tokens = len(prompt.split()), len(content.split())
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens, 'total_tokens': prompt_tokens + completion_tokens}
+
+
+def send_response(handler, status, body, content_type):
+    """Sends a complete HTTP response."""
+    data = body.encode('utf-8')
+    handler.send_response(status)
+    handler.send_header('Content-Type', content_type)
+    handler.send_header('Content-Length', str(len(data)))
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """A minimal SMTP server that accepts any login and counts the received messages."""
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode('utf-8'))
+
+    def handle(self):
+        self.reply('220 loadtest ESMTP sink')
+        while True:
+            line = self.rfile.readline().decode('utf-8', 'replace').strip()
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.reply('250-loadtest')
+                self.reply('250-AUTH PLAIN')
+                self.reply('250 OK')
+            elif command == 'AUTH':
+                self.reply('235 Authentication successful')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline().rstrip(b'\r\n') != b'.':
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+def start_server(server):
+    """Serves requests in a daemon thread and returns the server's base URL."""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def peak_rss_mb():
+    """Returns the peak RSS of this process and of its finished children (the parsing pool), in MB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return own / scale, children / scale
+
+
+def time_stages(main, timings):
+    """
+    Wraps the stage functions of the main module so that their wall time is added to timings.
+    Args:
+        main (module): The imported main module.
+        timings (dict): Maps a stage name to its accumulated seconds.
+    """
+    for name, stage in STAGE_FUNCTIONS.items():
+        func = getattr(main, name)
+        if asyncio.iscoroutinefunction(func):
+            async def wrapper(*args, _func=func, _stage=stage, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await _func(*args, **kwargs)
+                finally:
+                    timings[_stage] = timings.get(_stage, 0.0) + time.perf_counter() - start
+        else:
+            def wrapper(*args, _func=func, _stage=stage, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return _func(*args, **kwargs)
+                finally:
+                    timings[_stage] = timings.get(_stage, 0.0) + time.perf_counter() - start
+        setattr(main, name, functools.wraps(func)(wrapper))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the whole pipeline against local stand-ins for comsoc.org, Notion, OpenRouter and SMTP."
+    )
+    parser.add_argument("--sources", type=int, default=1000, help="number of venue pages")
+    parser.add_argument("--new-cfps", type=int, default=200, help="new CFPs published per day")
+    parser.add_argument("--churn", type=float, default=0.1, help="fraction of venues with new CFPs per day")
+    parser.add_argument("--dup-rate", type=float, default=0.1, help="fraction of new CFPs cross-listed on a second venue")
+    parser.add_argument("--cfp-words", type=int, default=600, help="words per CFP page")
+    parser.add_argument("--page-kb", type=int, default=250, help="approximate size of every page in KB (real pages are about 250 KB)")
+    parser.add_argument("--days", type=int, default=1, help="days to simulate after the initial snapshot run")
+    parser.add_argument("--kb-blocks", type=int, default=20, help="top-level blocks of each Notion page")
+    parser.add_argument("--kb-depth", type=int, default=2, help="depth of the Notion block tree")
+    parser.add_argument("--kb-branching", type=int, default=3, help="children per nested Notion block")
+    parser.add_argument("--profiles", type=int, default=1, help="number of profiles (each with its own Notion page)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds before the first token of each LLM call")
+    parser.add_argument("--llm-tps", type=float, default=2000, help="LLM output tokens per second")
+    parser.add_argument("--llm-words", type=int, default=300, help="words per full analysis")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0, help="fraction of primary model calls that stall")
+    parser.add_argument("--llm-slow-latency", type=float, default=5.0, help="seconds before the first token of a stalled call")
+    parser.add_argument("--hedge-delay", type=float, help="enable the hedge model with this HEDGE_DELAY (seconds)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the fake site")
+    parser.add_argument("--keep", action="store_true", help="keep the working directory (logs, snapshots, archive)")
+    args = parser.parse_args()
+
+    # Start the fake servers
+    site = FakeSite(args.sources, args.new_cfps, args.churn, args.dup_rate, args.cfp_words, args.page_kb, args.seed)
+    llm_stats = {'calls': 0, 'lock': threading.Lock()}
+    site_url = start_server(ThreadingHTTPServer(('127.0.0.1', 0), make_site_handler(site)))
+    notion_url = start_server(ThreadingHTTPServer(('127.0.0.1', 0), make_notion_handler(args.kb_blocks, args.kb_depth, args.kb_branching)))
+    llm_url = start_server(ThreadingHTTPServer(('127.0.0.1', 0), make_llm_handler(
+        llm_stats, args.llm_latency, args.llm_tps, args.llm_words, args.llm_slow_rate, args.llm_slow_latency
+    )))
+    smtp = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPSinkHandler)
+    smtp.daemon_threads = True
+    smtp.messages, smtp.lock = 0, threading.Lock()
+    start_server(smtp)
+
+    # Run the pipeline in a scratch working directory so the real downloads/, cache/ and log are untouched
+    repo = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="cfpulse-loadtest-")
+    os.makedirs(os.path.join(workdir, "tmp"))
+    os.chdir(workdir)
+    sys.path.insert(0, repo)
+    profiles = [
+        {'name': f"user{i}", 'notion_page_id': f"page{i}", 'email_receiver': f"user{i}@loadtest.local"}
+        for i in range(args.profiles)
+    ]
+    with open("profiles.json", "w", encoding="utf-8") as f:
+        json.dump(profiles, f)
+    os.environ.update({
+        'ROUTE': 'loadtest/primary', 'API_KEY': 'loadtest', 'BASE_URL': f"{llm_url}/v1",
+        'NOTION_PAGE_ID': 'page0', 'NOTION_TOKEN': 'loadtest', 'NOTION_API_URL': f"{notion_url}/v1",
+        'TMP_FOLDER': os.path.join(workdir, "tmp"), 'RESULTS_FILENAME': 'RESULTS',
+        'EMAIL_RECEIVER': 'user0@loadtest.local', 'EMAIL_HOST': '127.0.0.1', 'EMAIL_PORT': str(smtp.server_address[1]),
+        'EMAIL_HOST_USER': 'cfpulse@loadtest.local', 'EMAIL_HOST_PASSWORD': 'loadtest', 'EMAIL_USE_TLS': 'false',
+        'CACHE_FOLDER': os.path.join(workdir, "cache"),
+    })
+    if args.hedge_delay is not None:
+        os.environ.update({'HEDGE_ROUTE': 'loadtest/hedge', 'HEDGE_DELAY': str(args.hedge_delay)})
+    if args.profiles > 1:
+        os.environ['PROFILES_FILE'] = os.path.join(workdir, "profiles.json")
+
+    import main
+    main.URLS = [
+        {'name': f"Venue {i}", 'base': site_url, 'url': f"{site_url}/venues/{i}/cfp", 'element': '<div  class="main-content main-content--with-sidebar">'}
+        for i in range(args.sources)
+    ]
+
+    # Day 0 takes the first snapshot of every venue; later days find the new CFPs
+    print(f"Working directory: {workdir}")
+    start = time.perf_counter()
+    asyncio.run(main.main())
+    print(f"Initial snapshot of {args.sources} sources: {time.perf_counter() - start:.2f}s")
+
+    failures = 0
+    for day in range(1, args.days + 1):
+        published = site.advance_day()
+        timings = {}
+        time_stages(main, timings)
+        calls_before, emails_before = llm_stats['calls'], smtp.messages
+        start = time.perf_counter()
+        asyncio.run(main.main())
+        elapsed = time.perf_counter() - start
+        emails = smtp.messages - emails_before
+        print(f"\nDay {day}: {published} new CFPs on {args.sources} sources, {args.profiles} profile(s)")
+        print(f"  end-to-end: {elapsed:.2f}s, {published / elapsed:.2f} CFPs/s")
+        print(f"  LLM calls: {llm_stats['calls'] - calls_before}, emails: {emails}")
+        for stage in ['fetch', 'kb', 'extract', 'analyze', 'save', 'email', 'cleanup']:
+            seconds = timings.get(stage, 0.0)
+            print(f"  {stage:<8} {seconds:8.2f}s  {100 * seconds / elapsed:5.1f}%")
+        # Undo the wrappers before the next day
+        for name in STAGE_FUNCTIONS:
+            setattr(main, name, getattr(main, name).__wrapped__)
+
+        # Every unique CFP is emailed once to every profile, and nothing is left unfinished
+        unfinished = len(main.load_journal(main.JOURNAL_FILE_PATH)['cfps'])
+        if emails != published * args.profiles:
+            print(f"  CHECK FAILED: expected {published * args.profiles} emails, got {emails}")
+            failures += 1
+        if unfinished:
+            print(f"  CHECK FAILED: {unfinished} CFPs left in the run journal")
+            failures += 1
+
+    own, children = peak_rss_mb()
+    print(f"\nPeak RSS: {own:.1f} MB (main process), {children:.1f} MB (largest parsing worker)")
+
+    os.chdir(repo)
+    if not args.keep:
+        shutil.rmtree(workdir)
+    if failures:
+        print(f"{failures} checks failed")
+        sys.exit(1)
@@ -1,12 +1,18 @@
 from utils import *
 from urls import URLS
+from dedup import cluster_cfps, normalize_url, load_seen, save_seen, remember_cfps, find_seen_cfps
+from archive import archive_cfps
+from journal import (
+    load_journal, reached_stage, set_stage, update_cfp, delete_cfp, finished_cfps, prune_journal, RESULT_FIELDS
+)
 import os
-from agents import agent
-from pydantic_ai.providers.openrouter import OpenRouterProvider
+from agents import agent, score_agent, hedge_agent, hedge_score_agent, run_hedged, run_agent_output, make_provider
 from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIModel
 from dotenv import load_dotenv
 import asyncio
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import json
 import logging
 
 # Folder to store downloaded files
@@ -22,130 +28,513 @@ BASE_URL = os.getenv("BASE_URL")
 PAGE_ID = os.getenv("NOTION_PAGE_ID")
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 TMP_FOLDER = os.getenv("TMP_FOLDER")
-KB_FILENAME = os.getenv("KB_FILENAME")
 RESULTS_FILENAME = os.getenv("RESULTS_FILENAME")
-KB_FILE_PATH = TMP_FOLDER + "/" + KB_FILENAME + ".txt"
 RESULTS_FILE_PATH = TMP_FOLDER + "/" + RESULTS_FILENAME + ".json"
 EMAIL_RECEIVER = os.getenv("EMAIL_RECEIVER")
+# KB_MODE is "condensed" (default) or "full" (raw Notion markdown, kept for quality comparison)
+KB_MODE = os.getenv("KB_MODE", "condensed")
+CACHE_FOLDER = os.getenv("CACHE_FOLDER", "cache")
+# Minimum estimated text similarity (0-1) for two CFPs to be treated as the same CFP
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+# Only CFPs scoring at least MIN_FIT_SCORE (0-4) in the first pass get the full analysis
+MIN_FIT_SCORE = int(os.getenv("MIN_FIT_SCORE", "2"))
+# Per-call deadline and hedge delay (seconds) for AI agent calls
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "300"))
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "30"))
+# Durable per-CFP journal that lets a failed run resume where it stopped
+JOURNAL_FILE_PATH = os.getenv("JOURNAL_FILE_PATH", os.path.join(CACHE_FOLDER, "journal.jsonl"))
+MAX_FETCH_ATTEMPTS = 3
+# CFPs emailed by earlier runs, remembered for SEEN_DAYS so that reposted duplicates are not analyzed again
+SEEN_FILE_PATH = os.getenv("SEEN_FILE_PATH", os.path.join(CACHE_FOLDER, "seen.json"))
+SEEN_DAYS = int(os.getenv("SEEN_DAYS", "180"))
+# Optional JSON list of profiles ({"name", "notion_page_id", "email_receiver", "notion_token"}) sharing one run
+PROFILES_FILE = os.getenv("PROFILES_FILE")
+# Comma-separated recipients of failure alerts (defaults to every profile's email_receiver)
+ALERT_RECEIVER = os.getenv("ALERT_RECEIVER")
+# SQLite archive of every analyzed CFP, searchable with `python archive.py`
+ARCHIVE_PATH = os.getenv("ARCHIVE_PATH", os.path.join(CACHE_FOLDER, "archive.db"))
+# Number of worker processes for CPU-bound HTML parsing and Markdown conversion. One worker already overlaps
+# parsing with downloads; raise it only if bench_parse.py shows a speedup on the host.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "1"))
+# Venue pages parsed at once; bounds the pages held in memory while the pool is busy
+MAX_PAGES_IN_FLIGHT = PARSE_WORKERS * 2
 
 # Initialize AI model and agent
-model = OpenAIModel(ROUTE, provider=OpenRouterProvider(api_key=API_KEY))
+model = OpenAIModel(ROUTE, provider=make_provider())
 agent = Agent(model)
 
 
-def process_url(entry):
+def journal_new_links(name, base, results, journal, seen):
     """
-    Process a single URL entry: fetch, compare, print results, and fetch linked <a> hrefs.
+    Journal the CFP links found in the changed parts of a venue page, skipping CFPs emailed by earlier runs.
     Args:
-        entry (dict): Contains 'name', 'base', 'url', and 'element'.
-    """
-    name = entry['name']
-    url = entry['url']
-    base = entry['base']
-    element = entry.get('element')
-    subfolder = os.path.join(DEST_FOLDER, name)
-    filename = get_filename_from_url(url)
-    # Download the file and get its content and path
-    new_content, file_path = download_file(url, subfolder, filename)
-    if os.path.exists(file_path):
-        # If file exists, compare with old content and extract new links
-        with open(file_path, 'r', encoding='utf-8') as f:
-            old_content = f.read()
-        logging.info(f"--- Checking: {name} ---")
-        results = show_diff_and_extract_links(old_content, new_content, base, element)
-        for entry in results:
-            href = entry['href']
-            text = entry.get('text')
-            if href:
-                fetch_and_store_linked_file(href, TMP_FOLDER, base, name=name, text=text)
+        name (str): The venue name.
+        base (str): The base URL of the venue.
+        results (list): Link dicts returned by show_diff_and_extract_links.
+        journal (dict): The run journal.
+        seen (dict): The store of CFPs emailed by earlier runs.
+    """
+    for entry in results:
+        href = entry['href']
+        text = entry.get('text')
+        if href:
+            key = normalize_url(href)
+            item = journal['cfps'].get(key)
+            if item is None and key in seen['cfps']:
+                logging.info(f"Skipping CFP already emailed by an earlier run: {href}")
+            elif item is None:
+                set_stage(
+                    journal, key, 'found', JOURNAL_FILE_PATH,
+                    href=href, base=base, text=text, venues=[name], attempts=0
+                )
+            elif name not in item['venues']:
+                # Same CFP listed by several venues: fetch it once and cite every venue
+                update_cfp(journal, key, JOURNAL_FILE_PATH, venues=item['venues'] + [name])
+
+
+def process_urls(entries, journal, seen, executor):
+    """
+    Process the URL entries: fetch, compare, print results, and journal linked <a> hrefs.
+    Pages are downloaded in order while the CPU-bound diff and HTML parsing run in the worker pool,
+    with at most MAX_PAGES_IN_FLIGHT pages parsed at once.
+    A new snapshot is only saved once the new CFPs it reveals are safely journaled.
+    Args:
+        entries (list): Dicts containing 'name', 'base', 'url', and 'element'.
+        journal (dict): The run journal.
+        seen (dict): The store of CFPs emailed by earlier runs.
+        executor (ProcessPoolExecutor): The worker pool for HTML parsing.
+    """
+    in_flight = {}
+
+    def finish_pages(futures):
+        for future in futures:
+            entry, new_content, file_path = in_flight.pop(future)
+            journal_new_links(entry['name'], entry['base'], future.result(), journal, seen)
+            # Save the new content
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(new_content)
+
+    for entry in entries:
+        name = entry['name']
+        subfolder = os.path.join(DEST_FOLDER, name)
+        filename = get_filename_from_url(entry['url'])
+        # Download the file and get its content and path
+        new_content, file_path = download_file(entry['url'], subfolder, filename)
+        if os.path.exists(file_path):
+            # If file exists, compare with old content in the worker pool
+            logging.info(f"--- Checking: {name} ---")
+            future = executor.submit(
+                show_diff_and_extract_links, read_text_file(file_path), new_content, entry['base'], entry.get('element')
+            )
+            in_flight[future] = (entry, new_content, file_path)
+            if len(in_flight) >= MAX_PAGES_IN_FLIGHT:
+                finish_pages(wait(in_flight, return_when=FIRST_COMPLETED).done)
+        else:
+            # First time saving this file
+            logging.info(f"--- First time saving: {name} ---")
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(new_content)
+
+    finish_pages(wait(in_flight).done)
+
+
+def get_cfp_file_path(key):
+    """
+    Return the CFP file path of a journaled CFP. The name is derived from the journal key, since links
+    such as ".../cfp/" or ".../index.html" on different sites would otherwise share a file name.
+    Args:
+        key (str): The normalized CFP link.
+    Returns:
+        str: The path of the CFP file in TMP_FOLDER.
+    """
+    return os.path.join(TMP_FOLDER, f"{get_text_hash(key)[:16]}.txt")
+
+
+def fetch_journaled_cfps(journal, executor):
+    """
+    Fetch every journaled CFP that has not been fetched yet, converting it to Markdown in the worker pool
+    (at most MAX_PAGES_IN_FLIGHT pages at once), and restore the CFP files of fetched but unfinished CFPs
+    from the journal (e.g. after a crash that lost TMP_FOLDER).
+    Args:
+        journal (dict): The run journal.
+        executor (ProcessPoolExecutor): The worker pool for HTML parsing.
+    """
+    conversions = {}
+
+    def finish_conversions(futures):
+        for future in futures:
+            key, item = conversions.pop(future)
+            stored_path = store_cfp_file(
+                item['href'], TMP_FOLDER, future.result(), name=', '.join(item['venues']), text=item['text'],
+                filename=os.path.basename(get_cfp_file_path(key)),
+            )
+            set_stage(journal, key, 'fetched', JOURNAL_FILE_PATH, file_path=stored_path, content=read_text_file(stored_path))
+
+    for key, item in list(journal['cfps'].items()):
+        file_path = get_cfp_file_path(key)
+        if item['stage'] == 'found':
+            html = fetch_linked_html(item['href'], item['base'])
+            if html is not None:
+                conversions[executor.submit(extract_cfp_markdown, html)] = (key, item)
+                if len(conversions) >= MAX_PAGES_IN_FLIGHT:
+                    finish_conversions(wait(conversions, return_when=FIRST_COMPLETED).done)
+            elif item['attempts'] + 1 >= MAX_FETCH_ATTEMPTS:
+                logging.error(f"Giving up on {item['href']} after {MAX_FETCH_ATTEMPTS} failed fetches.")
+                delete_cfp(journal, key, JOURNAL_FILE_PATH)
+            else:
+                update_cfp(journal, key, JOURNAL_FILE_PATH, attempts=item['attempts'] + 1)
+        else:
+            if not os.path.exists(file_path):
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(item['content'])
+                logging.info(f"Restored CFP file from the run journal: {file_path}")
+            # Cite venues that listed the CFP after it was fetched
+            for name in item['venues']:
+                add_venue_to_cfp_file(file_path, name)
+            content = read_text_file(file_path)
+            if content != item['content'] or file_path != item['file_path']:
+                update_cfp(journal, key, JOURNAL_FILE_PATH, file_path=file_path, content=content)
+
+    finish_conversions(wait(conversions).done)
+
+
+def get_journal_keys(entry):
+    """
+    Return the journal keys of a CFP record and of the duplicates merged into it.
+    Args:
+        entry (dict): A CFP record.
+    Returns:
+        list: Normalized links of the record and its duplicates.
+    """
+    return [normalize_url(link) for link in [entry['link'], *entry.get('duplicates', [])]]
+
+
+def set_entry_stage(journal, entry, stage, profile=None, **fields):
+    """
+    Journal a stage for a CFP record and for the duplicates merged into it.
+    Args:
+        journal (dict): The run journal.
+        entry (dict): A CFP record.
+        stage (str): The completed stage.
+        profile (str, optional): The profile name, for the analyzed and emailed stages.
+        **fields: Extra fields to store for the CFP.
+    """
+    for key in get_journal_keys(entry):
+        if key in journal['cfps']:
+            set_stage(journal, key, stage, JOURNAL_FILE_PATH, profile, **fields)
+
+
+def journal_extracted_cfps(cfps, journal, seen):
+    """
+    Journal newly extracted CFP records with their MinHash signatures, dropping CFPs that are reposts
+    or near-duplicates of CFPs emailed by earlier runs. Dropped CFPs are remembered so they are not fetched again.
+    Args:
+        cfps (list): CFP records as returned by cluster_cfps.
+        journal (dict): The run journal.
+        seen (dict): The store of CFPs emailed by earlier runs.
+    Returns:
+        list: The CFP records to analyze.
+    """
+    new = [
+        entry for entry in cfps
+        if not reached_stage(journal, get_journal_keys(entry)[0], 'extracted')
+    ]
+    dropped = []
+    for entry, seen_key in find_seen_cfps(new, seen, DEDUP_THRESHOLD):
+        logging.info(f"Skipping CFP already emailed by an earlier run as {seen_key}: {entry['title']}")
+        remember_cfps(seen, {key: entry['signature'] for key in get_journal_keys(entry)})
+        dropped.append(entry)
+    if dropped:
+        # Remember the dropped CFPs before forgetting them in the journal
+        save_seen(seen, SEEN_FILE_PATH)
+        for entry in dropped:
+            for key in get_journal_keys(entry):
+                delete_cfp(journal, key, JOURNAL_FILE_PATH)
+
+    for entry in new:
+        if not any(entry is other for other in dropped):
+            set_entry_stage(journal, entry, 'extracted', signature=entry['signature'])
+    return [entry for entry in cfps if not any(entry is other for other in dropped)]
+
+
+async def prepare_kb_text(kb_text):
+    """
+    Return the KB text to embed in analysis prompts.
+    In "condensed" mode, the KB is distilled once per KB content hash and the result is reused until the KB changes.
+    In "full" mode, or if condensing exceeds LLM_DEADLINE, the raw KB text is returned unchanged.
+    Args:
+        kb_text (str): The raw KB text.
+    Returns:
+        str: The KB text for analysis prompts.
+    """
+    if KB_MODE == "full":
+        logging.info("Using full KB in prompts.")
+        return kb_text
+
+    kb_hash = get_text_hash(kb_text)
+    condensed = load_condensed_kb(CACHE_FOLDER, kb_hash)
+    if condensed is not None:
+        logging.info(f"Reusing condensed KB for hash {kb_hash}.")
+        return condensed
+
+    logging.info(f"Condensing KB for hash {kb_hash}...")
+    try:
+        response = await asyncio.wait_for(agent.run(generate_kb_condense_prompt(kb_text)), LLM_DEADLINE)
+    except TimeoutError:
+        logging.error(f"KB condensation timed out after {LLM_DEADLINE}s, using the full KB for this run.")
+        return kb_text
+    condensed = response.output.strip()
+    save_condensed_kb(CACHE_FOLDER, kb_hash, condensed)
+    return condensed
+
+
+def load_profiles():
+    """
+    Return the profiles (KB source and email recipient) to analyze the shared CFPs for.
+    Profiles are read from the JSON list in PROFILES_FILE; without it, a single "default" profile
+    is built from NOTION_PAGE_ID and EMAIL_RECEIVER.
+    Returns:
+        list: Dicts with 'name', 'notion_page_id', 'notion_token', and 'email_receiver'.
+    Raises:
+        ValueError: If a profile misses one of these settings; its CFPs could never be analyzed and emailed.
+    """
+    if PROFILES_FILE:
+        with open(PROFILES_FILE, 'r', encoding='utf-8') as f:
+            profiles = json.load(f)
     else:
-        # First time saving this file
-        logging.info(f"--- First time saving: {name} ---")
-    # Save the new content
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+        profiles = [{'name': 'default', 'notion_page_id': PAGE_ID, 'email_receiver': EMAIL_RECEIVER}]
+    for profile in profiles:
+        profile.setdefault('notion_token', NOTION_TOKEN)
+        missing = [field for field in ['notion_page_id', 'notion_token', 'email_receiver'] if not profile.get(field)]
+        if missing:
+            raise ValueError(f"Profile {profile.get('name')} is missing {', '.join(missing)}.")
+    logging.info(f"Loaded {len(profiles)} profiles: {', '.join(profile['name'] for profile in profiles)}")
+    return profiles
+
+
+def get_alert_receivers():
+    """
+    Return the recipients of failure alerts: ALERT_RECEIVER if set, otherwise the email_receiver of every profile.
+    Falls back to EMAIL_RECEIVER if the profiles cannot be loaded, e.g. when a broken PROFILES_FILE caused the failure.
+    Returns:
+        list: Email addresses.
+    """
+    if ALERT_RECEIVER:
+        return [receiver.strip() for receiver in ALERT_RECEIVER.split(',') if receiver.strip()]
+    try:
+        # Read the recipients directly, since a misconfigured profile may be what failed the run
+        receivers = [EMAIL_RECEIVER]
+        if PROFILES_FILE:
+            with open(PROFILES_FILE, 'r', encoding='utf-8') as f:
+                receivers = [profile.get('email_receiver') for profile in json.load(f)]
+    except Exception as e:
+        logging.error(f"Could not load profiles for the failure alert: {e}")
+        receivers = [EMAIL_RECEIVER]
+    receivers = list(dict.fromkeys(receiver for receiver in receivers if receiver))
+    if not receivers:
+        logging.error("Please set ALERT_RECEIVER or EMAIL_RECEIVER to receive failure alerts.")
+    return receivers
+
+
+def load_kbs(profiles):
+    """
+    Load the Notion KB of every profile as Markdown. Profiles sharing a Notion page load it once.
+    Args:
+        profiles (list): The profiles.
+    Returns:
+        dict: Maps a profile name to its KB text.
+    Raises:
+        ValueError: If a profile's Notion page is empty.
+    """
+    kb_texts = {}
+    pages = {}
+    for profile in profiles:
+        page_id = profile['notion_page_id']
+        if page_id not in pages:
+            pages[page_id] = notion_page_to_markdown(page_id, profile['notion_token'])
+            if not pages[page_id].strip():
+                raise ValueError(f"Notion page {page_id} of profile {profile['name']} is empty.")
+        else:
+            logging.info(f"Reusing Notion page {page_id} for profile {profile['name']}")
+        kb_texts[profile['name']] = pages[page_id]
+    return kb_texts
+
+
+async def analyze_cfps(cfps, kb_raw, journal, profile):
+    """
+    Analyze each CFP against a profile's KB, journaling every analysis and reusing analyses journaled earlier.
+    Args:
+        cfps (list): The profile's copy of the CFP records; analysis fields are set on them.
+        kb_raw (str): The profile's raw KB text.
+        journal (dict): The run journal.
+        profile (str): The profile name.
+    """
+    # Prepare the KB text (condensed or full) once for all prompts
+    kb_text = None
+    if any(
+        not reached_stage(journal, get_journal_keys(entry)[0], 'analyzed', profile)
+        for entry in cfps
+    ):
+        kb_text = await prepare_kb_text(kb_raw)
+
+    # Analyze each CFP with the AI agent
+    llm_stats = []
+    score_stats = []
+    for entry in cfps:
+        key = get_journal_keys(entry)[0]
+        if reached_stage(journal, key, 'analyzed', profile):
+            # Reuse the analysis journaled by a previous run
+            journaled = journal['cfps'][key]['profiles'][profile]
+            entry.update({field: journaled[field] for field in RESULT_FIELDS if field in journaled})
+            logging.info(f"Reusing journaled analysis for CFP: {entry['title']}")
+        else:
+            logging.info(f"--- Processing CFP: {entry['title']} ---")
+            logging.info(f"Venue: {entry['venue']}")
+            logging.info(f"Link: {entry['link']}")
+
+            # First pass: structured fit score with the fast model, hedged like the full analysis
+            score_stats.append({})
+            try:
+                score, _ = await run_hedged(
+                    score_agent, generate_fit_score_prompt(kb_text, entry['text']), LLM_DEADLINE, HEDGE_DELAY,
+                    hedge_score_agent, score_stats[-1], call=run_agent_output
+                )
+                entry['fit_score'] = score.score
+                entry['matched_categories'] = score.matched_categories
+                logging.info(f"Fit score: {entry['fit_score']}/4 ({', '.join(entry['matched_categories']) or 'no matches'})")
+            except TimeoutError:
+                logging.error(f"Fit scoring timed out after {LLM_DEADLINE}s, continuing with full analysis.")
+            except Exception as e:
+                logging.error(f"Fit scoring failed ({e}), continuing with full analysis.")
+
+            if entry.get('fit_score') is not None and entry['fit_score'] < MIN_FIT_SCORE:
+                entry['response'] = create_low_fit_response(entry, MIN_FIT_SCORE)
+                logging.info("Fit score below threshold, skipping full analysis.")
+                set_entry_stage(journal, entry, 'analyzed', profile, **{field: entry.get(field) for field in RESULT_FIELDS})
+                continue
+
+            # Second pass: generate prompt and run AI agent for the full write-up
+            prompt = generate_cfp_prompt(kb_text, entry['text'])
+            logging.info("Prompt generated successfully.")
+            entry['prompt'] = prompt
+
+            entry['llm_stats'] = {}
+            llm_stats.append(entry['llm_stats'])
+            try:
+                entry['response'], _ = await run_hedged(
+                    agent, prompt, LLM_DEADLINE, HEDGE_DELAY, hedge_agent, entry['llm_stats']
+                )
+                logging.info(f"Response generated by AI agent ({entry['llm_stats']}).")
+                set_entry_stage(journal, entry, 'analyzed', profile, **{field: entry.get(field) for field in RESULT_FIELDS})
+            except TimeoutError:
+                entry['response'] = f"The analysis timed out after {LLM_DEADLINE:.0f}s."
+                logging.error(f"AI agent timed out after {LLM_DEADLINE}s.")
+            except Exception as e:
+                # Leave the CFP unanalyzed in the journal so the next run retries it
+                entry['response'] = f"The analysis failed: {e}"
+                logging.error(f"AI agent failed: {e}")
+
+    log_llm_stats(score_stats, 'Fit scoring')
+    log_llm_stats(llm_stats, 'Analysis')
+
+
+def email_cfps(cfps, journal, profile):
+    """
+    Email each analyzed CFP to a profile's recipient, skipping CFPs already emailed by a previous run.
+    CFPs whose analysis did not complete (e.g. timed out) stay in the journal for the next run.
+    Args:
+        cfps (list): The profile's analyzed CFP records.
+        journal (dict): The run journal.
+        profile (dict): The profile.
+    """
+    for entry in cfps:
+        key = get_journal_keys(entry)[0]
+        if reached_stage(journal, key, 'emailed', profile['name']):
+            continue
+        if not reached_stage(journal, key, 'analyzed', profile['name']):
+            logging.warning(f"Not emailing {profile['name']} for unanalyzed CFP, left for the next run: {entry['title']}")
+            continue
+        email_body = create_email_body_for_entry(entry)
+
+        send_email_with_attachment(
+            subject=create_email_subject_for_entry(entry),
+            body=email_body,
+            to_email=profile['email_receiver'],
+        )
+        logging.info(f"Email sent to {profile['name']} for: {entry['title']}")
+        set_entry_stage(journal, entry, 'emailed', profile['name'])
 
 
 async def main():
     """
     Main workflow for fetching, processing, analyzing, and emailing CFPs.
+    CFPs are fetched and parsed once, then analyzed and emailed for every profile.
     Steps:
-    0. Download and check for new CFPs
-    1. Load Notion KB
+    0. Download and check for new CFPs (resuming unfinished CFPs from the run journal)
+    1. Load the Notion KB of each profile
     2. Load and parse CFP files
-    3. Analyze CFPs with AI agent
+    3. Analyze CFPs with AI agent for each profile
     4. Save results
-    5. Email results
+    5. Email results to each profile
     6. Cleanup temporary files
     """
     logging.info("-" * 50)
     logging.info("STEP 0: Finding New CFPs")
     logging.info("-" * 50)
 
-    # Download and process each URL
-    for entry in URLS:
-        process_url(entry)
+    journal = load_journal(JOURNAL_FILE_PATH)
+    seen = load_seen(SEEN_FILE_PATH, SEEN_DAYS)
+
+    # Download and process each URL, then fetch the journaled CFPs, parsing HTML in a worker pool
+    with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as executor:
+        process_urls(URLS, journal, seen, executor)
+        fetch_journaled_cfps(journal, executor)
 
     logging.info("-" * 50)
-    logging.info("STEP 1: Loading KB")
+    logging.info("STEP 1: Loading KBs")
     logging.info("-" * 50)
 
-    # Download and save Notion KB as Markdown
-    if not PAGE_ID or not NOTION_TOKEN:
-        logging.error("Please set NOTION_PAGE_ID and NOTION_TOKEN environment variables.")
-    else:
-        save_notion_markdown(PAGE_ID, NOTION_TOKEN, KB_FILE_PATH)
+    # Download each profile's Notion KB as Markdown
+    profiles = load_profiles()
+    kb_texts = load_kbs(profiles)
 
     logging.info("-" * 50)
     logging.info("STEP 2: Loading CFPs")
     logging.info("-" * 50)
 
     # Load all processed CFP files
-    cfps = load_diff_files(TMP_FOLDER, KB_FILENAME)
+    cfps = load_diff_files(TMP_FOLDER)
     logging.info(f"Total files processed: {len(cfps)}")
 
+    # Merge CFPs listed by several venues so each is analyzed and emailed once, also across runs
+    cfps = cluster_cfps(cfps, DEDUP_THRESHOLD)
+    cfps = journal_extracted_cfps(cfps, journal, seen)
+
     logging.info("-" * 50)
     logging.info("STEP 3: Processing CFPs with AI agent")
     logging.info("-" * 50)
 
-    # Analyze each CFP (except KB) with the AI agent
-    for entry in cfps:
-        if entry['venue'] != 'KB':  # Skip the KB entry itself
-            kb_entry = next((item for item in cfps if item['venue'] == 'KB'), None)
-            if kb_entry:
-                # Generate prompt and run AI agent
-                prompt = generate_cfp_prompt(kb_entry['text'], entry['text'])
-
-                logging.info(f"--- Processing CFP: {entry['title']} ---")
-                logging.info(f"Venue: {entry['venue']}")
-                logging.info(f"Link: {entry['link']}")
-                logging.info("Prompt generated successfully.")
-                entry['prompt'] = prompt
-
-                response = await agent.run(prompt)
-                entry['response'] = response.output
-                logging.info("Response generated by AI agent.")
+    # Analyze a copy of the shared CFP records for each profile
+    profile_cfps = {}
+    for profile in profiles:
+        logging.info(f"--- Profile: {profile['name']} ---")
+        profile_cfps[profile['name']] = [dict(entry) for entry in cfps]
+        await analyze_cfps(profile_cfps[profile['name']], kb_texts[profile['name']], journal, profile['name'])
 
-    # Save all CFP analysis results to JSON
-    save_cfps_to_json(cfps, RESULTS_FILE_PATH)
+    # Save all CFP analysis results to JSON and archive them
+    results = [dict(entry, profile=name) for name, entries in profile_cfps.items() for entry in entries]
+    save_cfps_to_json(results, RESULTS_FILE_PATH)
+    archive_cfps(results, ARCHIVE_PATH)
 
     logging.info("-" * 50)
     logging.info("STEP 5: Emailing results")
     logging.info("-" * 50)
 
-    # Email each CFP result (except KB)
-    for entry in cfps:
-        if entry['venue'] != 'KB':  # Skip the KB entry
-            email_body = create_email_body_for_entry(entry)
-
-            send_email_with_attachment(
-                subject=f"CFP Analysis: {entry['title']}",
-                body=email_body,
-                to_email=EMAIL_RECEIVER,
-            )
-            logging.info(f"Email sent for: {entry['title']}")
+    # Email each CFP result to each profile
+    for profile in profiles:
+        email_cfps(profile_cfps[profile['name']], journal, profile)
 
-    if any(entry['venue'] != 'KB' for entry in cfps):
+    if cfps:
         logging.info("All emails sent.")
     else:
         logging.info("No emails to send.")
@@ -156,6 +545,10 @@ async def main():
 
     # Cleanup temporary files (guaranteed to run if called from finally)
     cleanup_tmp_folder(TMP_FOLDER)
+    names = [profile['name'] for profile in profiles]
+    remember_cfps(seen, {key: item.get('signature') for key, item in finished_cfps(journal, names).items()})
+    save_seen(seen, SEEN_FILE_PATH)
+    prune_journal(journal, JOURNAL_FILE_PATH, names)
 
 
 if __name__ == "__main__":
@@ -169,9 +562,10 @@ if __name__ == "__main__":
     except Exception as e:
         # Log any unhandled exception and send an alert email
         logging.exception("Unhandled exception in main run")
-        send_failure_alert(
-            subject="CFPulse: Run Failed",
-            message=f"An error occurred:\n{str(e)}",
-            to_email=EMAIL_RECEIVER
-        )
+        for receiver in get_alert_receivers():
+            send_failure_alert(
+                subject="CFPulse: Run Failed",
+                message=f"An error occurred:\n{str(e)}",
+                to_email=receiver
+            )
     # Resource cleanup is handled in main()'s finally/cleanup section
@@ -9,6 +9,7 @@ import smtplib
 from email.message import EmailMessage
 from dotenv import load_dotenv
 import logging
+import hashlib
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,6 +19,11 @@ EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_PORT = os.getenv("EMAIL_PORT")
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
+# Set EMAIL_USE_TLS=false for SMTP servers without STARTTLS (e.g. a local relay)
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() != "false"
+
+# Notion API endpoint (overridable for proxies and local test servers)
+NOTION_API_URL = os.getenv("NOTION_API_URL", "https://api.notion.com/v1")
 
 # Configure logging to file with timestamps and log level
 logging.basicConfig(
@@ -164,37 +170,97 @@ def sanitize_filename(href):
     return name
 
 
-def fetch_and_store_linked_file(href, subfolder, base, name=None, text=None):
+def fetch_linked_html(href, base):
     """
-    Fetch the content at href, extract <div class="text-long">, convert it to Markdown, and store in subfolder as a .txt file. Use base for relative URLs.
+    Fetch the raw HTML at href. Use base for relative URLs.
     Args:
         href (str): The href to fetch.
-        subfolder (str): The folder to save the file in.
         base (str): The base URL for resolving relative hrefs.
-        name (str, optional): The name of the entry (journal/source).
-        text (str, optional): The anchor text of the link.
+    Returns:
+        bytes or None: The raw HTML, or None if the fetch failed.
     """
     url = urljoin(base, href)
-    filename = sanitize_filename(href)
-    file_path = os.path.join(subfolder, filename)
     try:
         response = requests.get(url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        div = soup.find('div', class_='text-long')
-        if div:
-            content = md(str(div))
-        else:
-            content = '<div class="text-long"> not found'
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(f"Venue: {name}\n" if name else "")
-            f.write(f"Link: {href}\n")
-            f.write(f"Title: {text}\n" if text else "")
-            f.write("-----\n\n")
-            f.write(content)
-        logging.info(f"Fetched and saved a new CFP for {name} as Markdown: {file_path}")
+        return response.content
     except Exception as e:
         logging.error(f"Failed to fetch {url}: {e}")
+        return None
+
+
+def extract_cfp_markdown(html):
+    """
+    Extract <div class="text-long"> from a CFP page and convert it to Markdown.
+    This is pure CPU work with a compact input and output, so it can run in a worker process.
+    Args:
+        html (bytes or str): The raw HTML of the CFP page.
+    Returns:
+        str: The Markdown content.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    div = soup.find('div', class_='text-long')
+    if div:
+        return md(str(div))
+    return '<div class="text-long"> not found'
+
+
+def store_cfp_file(href, subfolder, content, name=None, text=None, filename=None):
+    """
+    Store a CFP's Markdown content in subfolder as a .txt file with its venue, link, and title header.
+    Args:
+        href (str): The href of the CFP.
+        subfolder (str): The folder to save the file in.
+        content (str): The Markdown content.
+        name (str, optional): The name of the entry (journal/source).
+        text (str, optional): The anchor text of the link.
+        filename (str, optional): The file name; defaults to one derived from the href.
+    Returns:
+        str: The path of the stored file.
+    """
+    filename = filename or sanitize_filename(href)
+    file_path = os.path.join(subfolder, filename)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(f"Venue: {name}\n" if name else "")
+        f.write(f"Link: {href}\n")
+        f.write(f"Title: {text}\n" if text else "")
+        f.write("-----\n\n")
+        f.write(content)
+    logging.info(f"Fetched and saved a new CFP for {name} as Markdown: {file_path}")
+    return file_path
+
+
+def read_text_file(file_path):
+    """
+    Reads a text file.
+    Args:
+        file_path (str): The path of the file.
+    Returns:
+        str: The file content.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def add_venue_to_cfp_file(file_path, name):
+    """
+    Adds a venue to the "Venue:" line of a stored CFP file, for a CFP listed by several venues.
+    Args:
+        file_path (str): The path of the stored CFP file.
+        name (str): The venue to add.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    if lines and lines[0].startswith('Venue: '):
+        venues = lines[0][len('Venue: '):].split(', ')
+        if name in venues:
+            return
+        lines[0] += f", {name}"
+    else:
+        lines.insert(0, f"Venue: {name}")
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+    logging.info(f"CFP already fetched in this run, added venue {name} to {file_path}")
 
 
 def fetch_notion_blocks(page_id, notion_token):
@@ -207,7 +273,7 @@ def fetch_notion_blocks(page_id, notion_token):
         list: List of block objects from the Notion API.
     """
     logging.info(f"Fetching blocks for page/block: {page_id}")
-    url = f"https://api.notion.com/v1/blocks/{page_id}/children?page_size=100"
+    url = f"{NOTION_API_URL}/blocks/{page_id}/children?page_size=100"
     headers = {
         "Authorization": f"Bearer {notion_token}",
         "Notion-Version": "2022-06-28"
@@ -289,28 +355,12 @@ def notion_page_to_markdown(page_id, notion_token):
     return md
 
 
-def save_notion_markdown(page_id, notion_token, filename):
-    """
-    Saves a Notion page as a Markdown file.
-    Args:
-        page_id (str): The Notion page ID.
-        notion_token (str): The Notion integration token.
-        filename (str): The file path to save the Markdown content.
-    """
-    logging.info(f"Saving Notion page {page_id} as Markdown to {filename}...")
-    md = notion_page_to_markdown(page_id, notion_token)
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(md)
-    logging.info(f"Saved Notion page as Markdown to {filename}")
-
-
-def load_diff_files(folder, kb_filename):
+def load_diff_files(folder):
     """
     Read all files in the tmp folder and extract venue, link, title, and text.
     Returns a list of dictionaries with the specified attributes.
     Args:
         folder (str): The folder containing the files.
-        kb_filename (str): The filename for the knowledge base file.
     Returns:
         list: List of dictionaries with CFP data.
     """
@@ -327,31 +377,22 @@ def load_diff_files(folder, kb_filename):
                 with open(file_path, 'r', encoding='utf-8') as f:
                     content = f.read().strip()
 
-                if filename == kb_filename + ".txt":
-                    # For KB file, set venue, link, title to "KB"
-                    file_data = {
-                        'venue': 'KB',
-                        'link': 'KB',
-                        'title': 'KB',
-                        'text': content
-                    }
-                else:
-                    # For other files, extract from first three lines
-                    lines = content.split('\n')
-                    venue = lines[0] if len(lines) > 0 else ''
-                    link = lines[1] if len(lines) > 1 else ''
-                    title = lines[2] if len(lines) > 2 else ''
-
-                    # Remove the first three lines from text content
-                    text_lines = lines[3:] if len(lines) > 3 else []
-                    text = '\n'.join(text_lines).strip()
-
-                    file_data = {
-                        'venue': venue,
-                        'link': link,
-                        'title': title,
-                        'text': text
-                    }
+                # Extract venue, link, and title from the first three lines
+                lines = content.split('\n')
+                venue = lines[0] if len(lines) > 0 else ''
+                link = lines[1] if len(lines) > 1 else ''
+                title = lines[2] if len(lines) > 2 else ''
+
+                # Remove the first three lines from text content
+                text_lines = lines[3:] if len(lines) > 3 else []
+                text = '\n'.join(text_lines).strip()
+
+                file_data = {
+                    'venue': venue,
+                    'link': link,
+                    'title': title,
+                    'text': text
+                }
 
                 files_data.append(file_data)
                 logging.info(f"Processed file: {filename}")
@@ -362,6 +403,43 @@ def load_diff_files(folder, kb_filename):
     return files_data
 
 
+# Fit scoring rules shared by the scoring and the full analysis prompts
+FIT_RULES = """<RULES>
+        - If at least one of the directions listed in <CFP> is also mentioned in <KB>, then <CFP> is a 4/4 fit with <KB>.
+        - If none of the directions match, but there is a match in all three of the following categories—use cases, objectives, and constraints (i.e., at least one match in each)—then <CFP> is a 3/4 fit with <KB>.
+        - If none of the directions match, but there is a match in any two of the following categories—use cases, objectives, and constraints (i.e., at least one match in two categories)—then <CFP> is a 2/4 fit with <KB>.
+        - If none of the directions match, but there is a match in at least one of the categories—use cases, objectives, or constraints—then <CFP> is a 1/4 fit with <KB>.
+        - If there are no matches in directions, use cases, objectives, or constraints, then <CFP> is a 0/4 fit with <KB>.
+        </RULES>"""
+
+
+def generate_fit_score_prompt(kb_text, cfp_text):
+    """
+    Generate a short prompt that only asks for the fit score of a CFP against the KB and the matched categories.
+
+    Args:
+        kb_text (str): The knowledge base text containing research interests
+        cfp_text (str): The call for papers text
+
+    Returns:
+        str: The formatted prompt for fit scoring
+    """
+    return f"""Suppose that <KB> is my research interests, and <CFP> is a new call for paper.
+        Compare <CFP> with <KB> by applying the rules specified in <RULES>.
+        Return the fit score as an integer from 0 to 4, and the categories (directions, use cases, objectives, constraints) in which <CFP> and <KB> match.
+
+        {FIT_RULES}
+
+        <KB>
+        {kb_text}
+        </KB>
+
+        <CFP>
+        {cfp_text}
+        </CFP>
+    """
+
+
 def generate_cfp_prompt(kb_text, cfp_text):
     """
     Generate a prompt comparing a CFP to KB research interests.
@@ -376,13 +454,7 @@ def generate_cfp_prompt(kb_text, cfp_text):
     return f"""Suppose that <KB> is my research interests, and <CFP> is a new call for paper.
         Compare <CFP> with <KB> by applying the rules specified in <RULES>, and return the results in <STRUCTURE> format.
         
-        <RULES>
-        - If at least one of the directions listed in <CFP> is also mentioned in <KB>, then <CFP> is a 4/4 fit with <KB>.
-        - If none of the directions match, but there is a match in all three of the following categories—use cases, objectives, and constraints (i.e., at least one match in each)—then <CFP> is a 3/4 fit with <KB>.
-        - If none of the directions match, but there is a match in any two of the following categories—use cases, objectives, and constraints (i.e., at least one match in two categories)—then <CFP> is a 2/4 fit with <KB>.
-        - If none of the directions match, but there is a match in at least one of the categories—use cases, objectives, or constraints—then <CFP> is a 1/4 fit with <KB>.
-        - If there are no matches in directions, use cases, objectives, or constraints, then <CFP> is a 0/4 fit with <KB>.
-        </RULES>
+        {FIT_RULES}
 
         <STRUCTURE>
         <br><br><b>Key Overlaps and Fits:</b><br><br>
@@ -412,6 +484,85 @@ def generate_cfp_prompt(kb_text, cfp_text):
     """
 
 
+def generate_kb_condense_prompt(kb_text):
+    """
+    Generate a prompt that distills the KB into the categories used by the <RULES> of generate_cfp_prompt.
+
+    Args:
+        kb_text (str): The knowledge base text containing research interests
+
+    Returns:
+        str: The formatted prompt for condensation
+    """
+    return f"""Suppose that <KB> is my research interests.
+        Condense <KB> into a compact list of research directions, use cases, objectives, and constraints, and return the results in <STRUCTURE> format.
+        
+        <RULES>
+        - Directions are the research topics or problems that <KB> works on.
+        - Use cases are the application scenarios or systems that <KB> targets.
+        - Objectives are the goals or metrics that <KB> optimizes, such as latency, energy, or cost.
+        - Constraints are the limitations or requirements that <KB> considers, such as privacy, mobility, or resource budgets.
+        - Keep every item short (a few words). Do not drop any item mentioned in <KB>, and do not invent items that are not in <KB>.
+        </RULES>
+
+        <STRUCTURE>
+        Directions: comma-separated list of directions
+        Use cases: comma-separated list of use cases
+        Objectives: comma-separated list of objectives
+        Constraints: comma-separated list of constraints
+        </STRUCTURE>
+        
+        RETURN A RESPONSE JUST INCLUDING THE ABOVE <STRUCTURE> IN PLAIN TEXT. DONT ADD/RETURN ANYTHING ELSE.
+        
+        <KB>
+        {kb_text}
+        </KB>
+    """
+
+
+def get_text_hash(text):
+    """
+    Computes a stable hash of the given text, used to detect KB changes between runs.
+    Args:
+        text (str): The text to hash.
+    Returns:
+        str: The SHA-256 hex digest of the text.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def load_condensed_kb(cache_folder, kb_hash):
+    """
+    Loads the condensed KB stored for the given KB hash, if any.
+    Args:
+        cache_folder (str): The folder holding condensed KB files.
+        kb_hash (str): The hash of the raw KB text.
+    Returns:
+        str or None: The condensed KB text, or None if it has not been cached yet.
+    """
+    file_path = os.path.join(cache_folder, f"KB-{kb_hash}.txt")
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def save_condensed_kb(cache_folder, kb_hash, condensed_text):
+    """
+    Stores the condensed KB for the given KB hash so later runs can reuse it.
+    Args:
+        cache_folder (str): The folder holding condensed KB files.
+        kb_hash (str): The hash of the raw KB text.
+        condensed_text (str): The condensed KB text.
+    """
+    if not os.path.exists(cache_folder):
+        os.makedirs(cache_folder)
+    file_path = os.path.join(cache_folder, f"KB-{kb_hash}.txt")
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(condensed_text)
+    logging.info(f"Saved condensed KB to {file_path}")
+
+
 def save_cfps_to_json(cfps, filename):
     """
     Save the processed CFPs data to a JSON file.
@@ -429,12 +580,17 @@ def save_cfps_to_json(cfps, filename):
     json_data = []
     for entry in cfps:
         json_entry = {
+            'profile': entry.get('profile'),
             'venue': entry['venue'],
             'link': entry['link'],
             'title': entry['title'],
             'text': entry['text'],
+            'fit_score': entry.get('fit_score'),
+            'matched_categories': entry.get('matched_categories', []),
             'prompt': entry.get('prompt', ''),
-            'response': entry.get('response', '')
+            'response': entry.get('response', ''),
+            'llm_stats': entry.get('llm_stats', {}),
+            'duplicates': entry.get('duplicates', [])
         }
         json_data.append(json_entry)
 
@@ -447,6 +603,29 @@ def save_cfps_to_json(cfps, filename):
         logging.error(f"Error saving CFPs to JSON: {e}")
 
 
+def log_llm_stats(llm_stats, label='Analysis'):
+    """
+    Logs time-to-first-token and hedge-win rates over the hedged calls of one kind in a run.
+    Calls whose primary model never produced a first token are reported separately as censored,
+    since their TTFT is only known to be at least the time they were waited for.
+    Args:
+        llm_stats (list): Stats dicts returned by run_hedged.
+        label (str): The kind of call, e.g. 'Fit scoring' or 'Analysis'.
+    """
+    if not llm_stats:
+        return
+    ttfts = [s['ttft_primary'] for s in llm_stats if 'ttft_primary' in s]
+    censored = [s['ttft_primary_censored'] for s in llm_stats if 'ttft_primary_censored' in s]
+    hedged = sum(1 for s in llm_stats if s.get('hedged'))
+    hedge_wins = sum(1 for s in llm_stats if s.get('winner') == 'hedge')
+    if ttfts:
+        logging.info(f"{label} primary model TTFT: mean {sum(ttfts) / len(ttfts):.2f}s, max {max(ttfts):.2f}s over {len(ttfts)} calls")
+    if censored:
+        logging.info(f"{label} primary model TTFT censored for {len(censored)}/{len(llm_stats)} calls without a first token: "
+                     f">= {min(censored):.2f}s (waited up to {max(censored):.2f}s)")
+    logging.info(f"{label} hedged calls: {hedged}/{len(llm_stats)}, hedge wins: {hedge_wins}/{hedged if hedged else 0}")
+
+
 def send_email_with_attachment(subject, body, to_email):
     """
     Sends an email with the given subject and body to the specified recipient.
@@ -472,7 +651,8 @@ def send_email_with_attachment(subject, body, to_email):
 
     # Send the email
     with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-        server.starttls()
+        if EMAIL_USE_TLS:
+            server.starttls()
         server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
         server.send_message(msg)
 
@@ -520,7 +700,10 @@ def create_email_body_for_entry(entry):
 
     body = ""
 
+    body += f"{entry['venue']}\n"
     body += f"{entry['link']}\n"
+    for link in entry.get('duplicates', []):
+        body += f"Also listed at {link}\n"
     response_text = entry.get('response', 'No response available')
     response_text = response_text.replace('```markdown', '').replace('```', '')
     body += f"\n{response_text}\n"
@@ -529,6 +712,35 @@ def create_email_body_for_entry(entry):
     return body
 
 
+def create_email_subject_for_entry(entry):
+    """
+    Creates an email subject for an entry, including its fit score when available.
+
+    Returns:
+        str: Email subject
+    """
+    if entry.get('fit_score') is None:
+        return f"CFP Analysis: {entry['title']}"
+    return f"CFP Analysis [{entry['fit_score']}/4]: {entry['title']}"
+
+
+def create_low_fit_response(entry, min_fit_score):
+    """
+    Creates a short HTML response for a CFP whose fit score is below the threshold for the full analysis.
+    Args:
+        entry (dict): The CFP entry with 'fit_score' and 'matched_categories'.
+        min_fit_score (int): The minimum fit score for the full analysis.
+    Returns:
+        str: HTML response text
+    """
+    categories = ', '.join(entry.get('matched_categories') or []) or 'none'
+    return (
+        f"<br><br><b>Fit Score:</b> {entry.get('fit_score')}/4<br>"
+        f"<b>Matched Categories:</b> {categories}<br>"
+        f"<br>The full analysis was skipped because the fit score is below {min_fit_score}/4.<br>"
+    )
+
+
 def send_failure_alert(subject, message, to_email):
     """
     Sends an alert email if the main run fails.
@@ -545,7 +757,8 @@ def send_failure_alert(subject, message, to_email):
     msg["To"] = to_email
     msg.set_content(message)
     with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-        server.starttls()
+        if EMAIL_USE_TLS:
+            server.starttls()
         server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
         server.send_message(msg)
 